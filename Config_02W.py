@@ -19,6 +19,7 @@ class Config:
         write_timeout = None
         default_voltage = 2.5         #[V]
         default_current_limit = 0.100 #[A]
+        snapshot_file = '/dev/shm/psu_snapshot'   # latest 'values' (PSU_snapshot.py)
     class PATE:
         class Bus:
             port          = '/dev/ttyUSB1'
@@ -42,7 +42,10 @@ class PSU:
     #       PSU().status                str             ["OVER CURRENT" | "OK"]
     #       PSU().port                  serial.Serial
     # PSU functions:
-    #       PSU().values_tuple()        tuple
+    #       PSU().values                dict
+    #       PSU().pipeline()            PSU.Pipeline    (context manager)
+    #       PSU().reconnect()           None
+    #       PSU.attach()                PSU             (no init sequence)
     #       PSU.find()                  str             ["/dev/.." | None]
     #
     # notes
@@ -114,6 +117,178 @@ class PSU:
                 return measured_current                 
 
 
+    class PipelineError(ValueError):
+        """Raised by PSU.Pipeline if the device reported errors. Attribute
+        'errors' is a list of (index, command, code, message) tuples, where
+        index is the position of the failed command in the pipeline."""
+        def __init__(self, errors: list):
+            self.errors = errors
+            super().__init__('; '.join(
+                "#{0} '{1}': {2},{3}".format(*error) for error in errors
+            ))
+
+
+    class Pipeline:
+        """PSU.Pipeline - write-only commands, sent as one write per checkpoint.
+
+        Setters do not wait for read back. Each command is followed by an
+        error queue query ('SYST:ERR?') in the same write and the answers
+        are read in bulk at checkpoint, so errors map to command indices.
+        The error queue is cleared ('*CLS') before the first command, so
+        earlier errors are not blamed on the pipeline.
+
+        A command may queue several errors, so answers after the first
+        error cannot be told apart. The channel selected before the failed
+        command is then selected again, and the failed command and the rest
+        of the batch are sent again one at a time, reading the error queue
+        empty after each. Commands must therefore be idempotent (settings)
+        and channels must be selected with select_channel().
+
+        Use as a context manager, final checkpoint is made on exit:
+
+            with psu.pipeline() as p:
+                p.voltage = 3.3
+                p.current_limit = 0.2
+                p.power = True
+        """
+        # checkpoint automatically, keeps unread answers within port buffers
+        max_queue = 100
+
+        def __init__(self, psu):
+            self.psu      = psu
+            self.queue    = []          # commands since last checkpoint
+            self.count    = 0           # commands before current queue
+            self.errors   = []
+            self.cleared  = False       # error queue cleared before first command
+            self.channel  = None        # channel selected before current queue
+
+        def send(self, message: str):
+            """Queue SCPI command (must not produce a response)."""
+            self.queue.append(message)
+            if len(self.queue) >= self.max_queue:
+                self.checkpoint()
+
+        def select_channel(self, channel: str):
+            self.send('INST:SEL {0:s}'.format(channel))
+
+        @staticmethod
+        def __selected(commands: list, channel: str) -> str:
+            """Return channel selected after 'commands', starting from 'channel'."""
+            for command in commands:
+                if command.startswith('INST:SEL '):
+                    channel = command[len('INST:SEL '):]
+            return channel
+
+        def __power(self, value: bool):
+            self.send('OUTP ON' if value else 'OUTP OFF')
+
+        def __voltage(self, voltage_set_value: float):
+            self.send('VOLT {0:1.3f}'.format(voltage_set_value))
+
+        def __current_limit(self, current_set_value: float):
+            self.send('CURR {0:1.3f}'.format(current_set_value))
+
+        power         = property(fset = __power, doc = "Toggle power output ON or OFF.")
+        voltage       = property(fset = __voltage, doc = "Set PSU voltage.")
+        current_limit = property(fset = __current_limit, doc = "Set PSU current limit value.")
+
+        def __read_error(self) -> tuple:
+            """Read one 'SYST:ERR?' answer, return (code, message)."""
+            input_message=self.psu._PSU__read_message(80).decode('utf-8')
+            code, _, message = input_message.strip().partition(',')
+            return (int(code), message.strip('"'))
+
+        def __drain_errors(self) -> list:
+            """Read answer to a sent 'SYST:ERR?' and query until the error
+            queue is empty. Returns list of (code, message)."""
+            errors = []
+            code, message = self.__read_error()
+            while code != 0:
+                errors.append((code, message))
+                self.psu._PSU__send_message('SYST:ERR?')
+                code, message = self.__read_error()
+            return errors
+
+        def checkpoint(self) -> list:
+            """Send queued commands as one write and read their error queue
+            answers. Returns list of (index, command, code, message) for the
+            failed commands; they are also collected for the final report."""
+            if not self.queue:
+                return []
+            queue, self.queue = self.queue, []
+            messages = []
+            if not self.cleared:
+                #terminate partial command left in the device, drop old errors
+                messages.extend(('', '*CLS'))
+                self.cleared = True
+            #channel at batch start is needed to resend after an error
+            query_channel = (self.channel is None and
+                             self.__selected(queue, None) is not None)
+            if query_channel:
+                messages.append('INST:SEL?')
+            for command in queue:
+                messages.append(command)
+                messages.append('SYST:ERR?')
+            if debug_level == 2: print('pipeline:',len(queue),'commands')
+            self.psu._PSU__send_message('\r\n'.join(messages))
+
+            errors = []
+            try:
+                if query_channel:
+                    self.channel = self.psu._PSU__read_message().decode('utf-8').strip()
+                for i, command in enumerate(queue):
+                    code, message = self.__read_error()
+                    if code != 0:
+                        break
+                else:
+                    i = len(queue)
+                if i < len(queue):
+                    first = (self.count + i, queue[i], code, message)
+                    #later answers may hold further errors of command i,
+                    #discard them and empty the queue
+                    for _ in queue[i + 1:]:
+                        self.__read_error()
+                    self.psu._PSU__send_message('SYST:ERR?')
+                    self.__drain_errors()
+                    #batch ended on another channel, select the one command i used
+                    channel = self.__selected(queue[:i], self.channel)
+                    if channel is not None:
+                        self.psu._PSU__send_message('INST:SEL {0:s}\r\nSYST:ERR?'.format(channel))
+                        self.__drain_errors()
+                    #run failed command and the rest one at a time
+                    if debug_level == 2: print('pipeline: resend from command',self.count + i)
+                    for j, command in enumerate(queue[i:], self.count + i):
+                        self.psu._PSU__send_message(command + '\r\nSYST:ERR?')
+                        resent = self.__drain_errors()
+                        if j == first[0] and not resent:
+                            #not reproduced, keep the error read first
+                            errors.append(first)
+                        for code, message in resent:
+                            errors.append((j, command, code, message))
+            except ValueError:
+                #timeout or garbled answer, drop the rest of the answers
+                self.psu.serial_port.reset_input_buffer()
+                raise
+            finally:
+                self.count += len(queue)
+                self.channel = self.__selected(queue, self.channel)
+            if debug_level is not None:
+                for error in errors: print('pipeline error:',error)
+            self.errors.extend(errors)
+            return errors
+
+        def __enter__(self):
+            return self
+        def __exit__(self, exc_type, exc_value, traceback):
+            if exc_type is not None:
+                #do not send the rest of a failed script
+                self.queue = []
+                return
+            self.checkpoint()
+            if self.errors:
+                raise PSU.PipelineError(self.errors)
+
+
     @property
     def power(self) -> bool:
         """Read PSU power state ("ON" or "OFF")."""
@@ -265,21 +440,72 @@ class PSU:
     @property
     def status(self) -> str:
         """Read PSU Status (has/is current limit reached)."""
-        self.__send_message("Query current limit status...")
-        return ("OVER CURRENT", "OK")[(self.__read_message() == "<OK string response>")]
+        #read P25V channel (ISUM2) questionable condition register
+        #bit 0 is set when the output is in constant current mode
+        output_message = 'STAT:QUES:INST:ISUM2:COND?'
+        if debug_level == 2: 
+            print('output message:',output_message)
+        self.__send_message(output_message)
+        try:
+            input_message_byte=self.__read_message()
+        except ValueError:
+            #timeout
+            if debug_level is not None: print('ValueError exception')
+            raise
+        else:
+            #message received
+            input_message=input_message_byte.decode('utf-8')    #convert to string 
+            condition = int(input_message)
+            return ("OK", "OVER CURRENT")[condition & 0x01]
 
     @property
     def values(self) -> dict:
-        """Returns a tuple for SQL INSERT."""
+        """Returns a dictionary of current readings (SQL INSERT, snapshots)."""
         return dict({
             "power"               :"ON" if self.power else "OFF",
             "voltage_setting"     :self.voltage,
             "current_limit"       :self.current_limit,
             "measured_current"    :self.measure.current(),
             "measured_voltage"    :self.measure.voltage(),
-            "state"               :self.state
+            "state"               :self.status
         })
 
+    def pipeline(self):
+        """Return PSU.Pipeline for sending many settings without waiting
+        for read back after each (see PSU.Pipeline)."""
+        return self.Pipeline(self)
+
+    def reconnect(self, port = None):
+        """Reopen the serial port after link loss, without the init sequence
+        (device keeps its settings). Port may be a device name or an open
+        port object; if omitted, the current device name is reopened."""
+        if port is None:
+            port = self.serial_port.port
+        try:
+            self.serial_port.close()
+        except Exception:
+            pass
+        if debug_level is not None: print('reconnect port {0:s}'.format(str(port)))
+        self.serial_port = self.port = self.__open_port(port)
+        self.__set_remote_mode()
+
+    @classmethod
+    def attach(cls, port = None):
+        """Return PSU connected to port without the init sequence, so output
+        state and settings of the device are left as they are (monitoring).
+        Only the +25 V channel is selected, as in __init__(); selecting does
+        not change any output. If port argument is omitted, Config.PSU.port
+        is used."""
+        psu = cls.__new__(cls)
+        psu.measure = psu.Measure(psu)
+        port = port if port is not None else Config.PSU.port
+        if debug_level is not None: print('attach port {0:s}'.format(str(port)))
+        psu.serial_port = psu.port = psu.__open_port(port)
+        psu.__set_remote_mode()
+        #settings and measurements all refer to the +25 V channel
+        psu.__select_channel('P25V')
+        return psu
+
 #    def values_tuple(self) -> tuple:
 #        """Returns a tuple for SQL INSERT."""
 #        return (
@@ -304,7 +530,7 @@ class PSU:
         Return device file name or None if not found."""
         def transact(port, command: str) -> str:
             """Argument 'command' of type str. Returns type str"""
-            port.write(command.encode('utf-8'))
+            port.write((command + '\r\n').encode('utf-8'))
             line = port.readline()
             # If the last character is not '\n', we had a timeout
             if line[-1:] != b'\n':
@@ -332,10 +558,10 @@ class PSU:
             try:
                 port = serial.Serial(
                     port          = port,
-                    baudrate      = Config.PSU.Serial.baudrate,
-                    parity        = Config.PSU.Serial.parity,
-                    stopbits      = Config.PSU.Serial.stopbits,
-                    bytesize      = Config.PSU.Serial.bytesize,
+                    baudrate      = Config.PSU.baudrate,
+                    parity        = Config.PSU.parity,
+                    stopbits      = Config.PSU.stopbits,
+                    bytesize      = Config.PSU.bytesize,
                     timeout       = 0.1,
                     write_timeout = None
                 )
@@ -356,8 +582,8 @@ class PSU:
         import serial.tools.list_ports
         port = None
         for p in serial.tools.list_ports.comports(include_links=False):
-            if found_at(p):
-                port = p
+            if found_at(p.device):
+                port = p.device
                 break
         return port
 
@@ -374,7 +600,7 @@ class PSU:
     #
     def __init__(self, port = None):
         """Initialize object and test that we are connected to PSU by issuing a version query.
-        If port argument is omitted, Config.PSU.Serial.port is used."""
+        If port argument is omitted, Config.PSU.port is used."""
         self.measure = self.Measure(self) # <- must be here
         # def __init__(self,serial_port1,read_timeout):
         """Copied from 'PSU_class_010.py', 09.11.2018."""
@@ -382,30 +608,14 @@ class PSU:
         #raise SerialException if device cannot be configured
         #raise ValueException if parameters are out of range
 
-        #serial interface
-        port          = port
-        #port          = "COM14"
-        baudrate      = Config.PSU.baudrate
-        bytesize      = Config.PSU.bytesize
-        parity        = Config.PSU.parity
-        stopbits      = Config.PSU.stopbits
-        timeout       = Config.PSU.timeout
-        write_timeout = None
-        xonxoff       = False
-        rtscts        = False
-        dsrdtr        = True
-        #note: port -parameter is needed to scan serial ports
-        #note: port and timeout is not read from config.py -file
-        #note: change to self ? reading directly from here       
-        if debug_level is not None: print('init port {0:s}..... '.format(port),end='')
+        port          = port if port is not None else Config.PSU.port
+        if debug_level is not None: print('init port {0:s}..... '.format(str(port)),end='')
 
         #print('init port',port,'..... ',end='')     #Python 3.0 or newer version required
         
         #open serial port
         try:
-            self.serial_port = serial.Serial(port,baudrate,bytesize,parity,
-                                        stopbits,timeout,xonxoff,rtscts,
-                                        write_timeout,dsrdtr)
+            self.serial_port = self.port = self.__open_port(port)
         except:
             if debug_level is not None: print('failed')
             raise
@@ -514,6 +724,32 @@ class PSU:
                             raise ValueError('selected channel not verified')
   
              
+    def __open_port(self, port):
+        """Open serial port with PSU settings. An already opened port object
+        (e.g. PSU_emulator.Emulator) is returned as is."""
+        #raise SerialException if device cannot be configured
+        #raise ValueException if parameters are out of range
+        if not isinstance(port, str):
+            return port
+
+        #serial interface
+        baudrate      = Config.PSU.baudrate
+        bytesize      = Config.PSU.bytesize
+        parity        = Config.PSU.parity
+        stopbits      = Config.PSU.stopbits
+        timeout       = Config.PSU.timeout
+        write_timeout = None
+        xonxoff       = False
+        rtscts        = False
+        dsrdtr        = True
+        #note: port -parameter is needed to scan serial ports
+        #note: port and timeout is not read from config.py -file
+        #note: change to self ? reading directly from here       
+        return serial.Serial(port,baudrate,bytesize,parity,
+                             stopbits,timeout,xonxoff,rtscts,
+                             write_timeout,dsrdtr)
+
+             
     def __send_message(self,message_data_str_out):
         """Copied from 'PSU_class_010.py', 09.11.2018."""
     
@@ -534,7 +770,7 @@ class PSU:
         return
 
 
-    def __read_message(self):
+    def __read_message(self, size = 20):
         """read message from PSU
         Copied from 'PSU_class_010.py', 09.11.2018."""
         #read message from PSU
@@ -543,7 +779,7 @@ class PSU:
 
         if debug_level == 2: print('read timeout:',self.serial_port.timeout)
         #received_message_bytes=self.serial_port.read(4) #read 4 bytes from serial
-        received_message_bytes=self.serial_port.read_until(b'\r\n',20) #read max. 20 bytes from serial
+        received_message_bytes=self.serial_port.read_until(b'\r\n',size) #read max. 20 bytes (default) from serial
         if received_message_bytes[-1:] != b'\n': 
             if debug_level == 2: print ('timeout {0:1.2f} s'.format(self.serial_port.timeout))
             raise ValueError("Serial read timeout! ({0:1.2f} s)".format(self.serial_port.timeout))
@@ -691,47 +927,135 @@ class PSU:
 
 
 
-if __name__ == "__main__":
-    """Basic test"""
-    import os
-
-
-    print("Finding PSU...", end="", flush=True)
-    try:
+def main(argv = None) -> int:
+    """Command line interface. Returns exit status.
+
+        python3 PSU_A017W.py snapshot [--format text|csv|jsonl]
+        python3 PSU_A017W.py stream [--format csv|jsonl] [--rate HZ] [--count N]
+        python3 PSU_A017W.py set [--power on|off] [--voltage V] [--current-limit A]
+
+    The PSU is attached without the init sequence (see PSU.attach()), so
+    output state and settings are changed only by 'set'."""
+    # Only what the chosen subcommand needs is imported
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description = "Agilent PSU monitor.")
+    parser.add_argument('--port', default = None,
+                        help = "serial port (default: Config.PSU.port)")
+    parser.add_argument('--find', action = 'store_true',
+                        help = "search serial ports for the PSU")
+    parser.add_argument('--emulate', action = 'store_true',
+                        help = "use PSU_emulator.Emulator instead of a serial port")
+    commands = parser.add_subparsers(dest = 'command', metavar = 'command')
+    commands.required = True
+    p = commands.add_parser('snapshot', help = "print one reading")
+    p.add_argument('--format', choices = ('text', 'csv', 'jsonl'), default = 'text')
+    p = commands.add_parser('stream', help = "print readings continuously")
+    p.add_argument('--format', choices = ('csv', 'jsonl'), default = 'csv')
+    p.add_argument('--rate', type = float, default = 1.0,
+                   help = "readings per second, 0 = as fast as possible (default: %(default)s)")
+    p.add_argument('--count', type = int, default = 0,
+                   help = "number of readings, 0 = until interrupted (default: %(default)s)")
+    p.add_argument('--no-header', action = 'store_true',
+                   help = "omit CSV header row")
+    p = commands.add_parser('set', help = "apply settings, print read back values")
+    p.add_argument('--power', choices = ('on', 'off'))
+    p.add_argument('--voltage', type = float, help = "voltage setting [V]")
+    p.add_argument('--current-limit', type = float, help = "current limit [A]")
+    args = parser.parse_args(argv)
+
+    if args.emulate:
+        from PSU_emulator import Emulator
+        port = Emulator(timeout = Config.PSU.timeout)
+    elif args.find:
         port = PSU.find()
         if not port:
-            print("not found!")
-            os._exit(-1)
-    except:
-        print("\nAbnormal termination!")
-        raise
-
-
-    with PSU(port) as psu:
-        print(psu.values_tuple)
-
-
-        psu.power = False
-        psu.voltage = 3.3
-        psu.current_limit = 0.3
-        if psu.measure.voltage() > 0.02:
-            raise ValueError("Unexpected voltage at terminal!")
-
-
-        psu.power = True
-        if abs(psu.measure.voltage() - psu.voltage) > 0.05:
-            raise ValueError("Unexpected voltage difference between set and measured values!")
-
+            print("PSU not found!", file = sys.stderr)
+            return 1
+    else:
+        port = args.port
+
+    fields = ("timestamp", "power", "voltage_setting", "current_limit",
+              "measured_current", "measured_voltage", "state")
+    # Block buffered output, flushed explicitly when idle
+    out = open(sys.stdout.fileno(), 'w', buffering = 65536,
+               encoding = 'utf-8', newline = '', closefd = False)
+    try:
+        with PSU.attach(port) as psu:
+            if args.command == 'set':
+                #pipeline sends zero values too and reports device errors.
+                #output is turned off first and on last
+                with psu.pipeline() as p:
+                    if args.power == 'off':
+                        p.power = False
+                    if args.voltage is not None:
+                        p.voltage = args.voltage
+                    if args.current_limit is not None:
+                        p.current_limit = args.current_limit
+                    #output is turned on only if the setpoints were accepted
+                    if args.power == 'on' and not p.checkpoint():
+                        p.power = True
+                args.format = 'text'
+                args.command = 'snapshot'
+
+            if args.format == 'text':
+                values = psu.values
+                for key in fields[1:]:
+                    out.write("{0:<20s}{1}\n".format(key, values[key]))
+                return 0
+
+            if args.format == 'csv':
+                import csv
+                writer = csv.writer(out, lineterminator = '\n')
+                if args.command == 'snapshot' or not args.no_header:
+                    writer.writerow(fields)
+                def write(values):
+                    writer.writerow([values[key] for key in fields])
+            else:
+                import json
+                encode = json.JSONEncoder(separators = (',', ':')).encode
+                def write(values):
+                    out.write(encode(values))
+                    out.write('\n')
+
+            if args.command == 'snapshot':
+                count, period = 1, 0.0
+            else:
+                count = args.count
+                period = 1.0 / args.rate if args.rate > 0 else 0.0
+            next_time = time.monotonic()
+            n = 0
+            while count == 0 or n < count:
+                write(dict(timestamp = time.time(), **psu.values))
+                n += 1
+                if period:
+                    out.flush()
+                    next_time += period
+                    delay = next_time - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        # fell behind, do not try to catch up
+                        next_time = time.monotonic()
+    except (serial.SerialException, ValueError) as e:
+        print("{0}: {1}".format(type(e).__name__, e), file = sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    except BrokenPipeError:
+        # reader went away (e.g. '| head'), nothing more to write
+        pass
+    finally:
+        try:
+            out.close()
+        except BrokenPipeError:
+            pass
+    return 0
 
-        print(psu.values_tuple)
-        psu.power = False
 
-        """
-        except Exception as ex:
-            print('other exception')
-            template = "An exception of type {0} occurred. Arguments:\n{1!r}"
-            message = template.format(type(ex).__name__, ex.args)
-            print ("exeption1:",message)
-            raise"""
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
 
 # EOF
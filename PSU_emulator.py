@@ -0,0 +1,288 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PSU_emulator.py - Emulated Agilent E3631A behind serial.Serial interface
+#   0.1     2026.10.19  Initial version.
+#
+#
+# Emulator implements the subset of serial.Serial used by PSU class and
+# answers the SCPI commands PSU class sends. It can be given to PSU()
+# instead of a port name:
+#
+#       with PSU(Emulator()) as psu:
+#           print(psu.values)
+#
+# Output is modelled as ideal source driving a resistive load, so current
+# limit and constant current mode ("OVER CURRENT" status) behave sensibly.
+#
+import re
+import time
+
+
+class Emulator:
+
+    #
+    # Channel limits (voltage range, maximum current limit), ISUMmary suffix
+    #
+    channels = {
+        'P6V'   : ((0.0, 6.18),    5.15, 1),
+        'P25V'  : ((0.0, 25.75),   1.03, 2),
+        'N25V'  : ((-25.75, 0.0),  1.03, 3)
+    }
+
+    def __init__(self, load: float = 50.0, delay: float = 0.0, timeout: float = 0.5):
+        """Create emulated PSU. 'load' is the load resistance [ohm] on every
+        channel, 'delay' is added to each query response [s] and 'timeout'
+        is the read timeout, as in serial.Serial."""
+        self.load       = load
+        self.delay      = delay
+        self.timeout    = timeout
+        self.is_open    = True
+        self.port       = 'emulator'
+        self.reset()
+        # SCPI command table, optional nodes in brackets, '#' numeric suffix
+        self.commands = [
+            ('*IDN?',                                        self.__idn),
+            ('*RST',                                         self.__rst),
+            ('*CLS',                                         self.__cls),
+            ('*OPC?',                                        self.__opc),
+            ('SYSTem:REMote',                                None),
+            ('SYSTem:VERSion?',                              self.__version),
+            ('SYSTem:ERRor?',                                self.__error),
+            ('OUTPut[:STATe]',                               self.__output),
+            ('OUTPut[:STATe]?',                              self.__output),
+            ('INSTrument[:SELect]',                          self.__select),
+            ('INSTrument[:SELect]?',                         self.__select),
+            ('[SOURce]:VOLTage[:LEVel][:IMMediate][:AMPLitude]',  self.__voltage),
+            ('[SOURce]:VOLTage[:LEVel][:IMMediate][:AMPLitude]?', self.__voltage),
+            ('[SOURce]:CURRent[:LEVel][:IMMediate][:AMPLitude]',  self.__current),
+            ('[SOURce]:CURRent[:LEVel][:IMMediate][:AMPLitude]?', self.__current),
+            ('MEASure[:VOLTage][:DC]?',                      self.__measure_voltage),
+            ('MEASure:CURRent[:DC]?',                        self.__measure_current),
+            ('STATus:QUEStionable:INSTrument:ISUMmary#:CONDition?', self.__isum)
+        ]
+        self.commands = [(self.__compile(p), f) for p, f in self.commands]
+
+
+    def reset(self):
+        """Power-on state of the device."""
+        self.output   = False
+        self.selected = 'P6V'
+        self.setting  = {ch: [0.0, limits[1]] for ch, limits in self.channels.items()}
+        self.errors   = []
+        self.input    = bytearray()
+        self.response = bytearray()
+
+
+    ###########################################################################
+    #
+    # serial.Serial interface
+    #
+    def write(self, data: bytes) -> int:
+        if not self.is_open:
+            raise OSError("Emulated port is closed")
+        self.input += data
+        while b'\n' in self.input:
+            line, _, self.input = self.input.partition(b'\n')
+            self.__execute(line.decode('utf-8').strip())
+        return len(data)
+
+    def read_until(self, expected: bytes = b'\n', size: int = None) -> bytes:
+        if not self.is_open:
+            raise OSError("Emulated port is closed")
+        end = self.response.find(expected)
+        if end < 0:
+            end = len(self.response)
+            if size is None or end < size:
+                # nothing more is coming, wait like a real port would
+                if self.timeout:
+                    time.sleep(self.timeout)
+        else:
+            end += len(expected)
+        if size is not None:
+            end = min(end, size)
+        data = bytes(self.response[:end])
+        del self.response[:end]
+        return data
+
+    def readline(self, size: int = None) -> bytes:
+        return self.read_until(b'\n', size)
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self.response)
+
+    def reset_input_buffer(self):
+        self.response = bytearray()
+
+    def reset_output_buffer(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+    ###########################################################################
+    #
+    # SCPI parser
+    #
+    @staticmethod
+    def __compile(pattern: str) -> list:
+        """Turn 'NODE[:OPTional]' pattern into list of (short, long, optional)."""
+        nodes = []
+        for optional, node in re.findall(r'(\[?):?([*A-Za-z#]+)', pattern):
+            short = ''.join(c for c in node if not c.islower())
+            nodes.append((short, node.upper(), bool(optional)))
+        return (nodes, pattern.endswith('?'))
+
+    @staticmethod
+    def __match(nodes: list, header: list) -> list:
+        """Match header nodes against compiled pattern. Return list of numeric
+        suffixes (for '#' nodes) or None if header does not match."""
+        if not nodes:
+            return [] if not header else None
+        (short, long, optional), rest = nodes[0], nodes[1:]
+        if header:
+            node, suffix = header[0], None
+            if short.endswith('#'):
+                short, long = short[:-1], long[:-1]
+                stripped = node.rstrip('0123456789')
+                suffix = int(node[len(stripped):] or 1)
+                node = stripped
+            if node in (short, long):
+                result = Emulator.__match(rest, header[1:])
+                if result is not None:
+                    return ([suffix] if suffix is not None else []) + result
+        if optional:
+            return Emulator.__match(rest, header)
+        return None
+
+    def __execute(self, line: str):
+        if not line:
+            return
+        header, _, argument = line.partition(' ')
+        argument = argument.strip()
+        query = header.endswith('?')
+        header = header.rstrip('?').upper()
+        header = header[1:] if header.startswith(':') else header
+        for (nodes, is_query), function in self.commands:
+            if is_query != query:
+                continue
+            suffixes = self.__match(nodes, header.split(':'))
+            if suffixes is None:
+                continue
+            if function is None:
+                return
+            try:
+                result = function(query, argument, *suffixes)
+            except ValueError as e:
+                self.errors.append(str(e))
+                return
+            if query:
+                if self.delay:
+                    time.sleep(self.delay)
+                self.response += (result + '\r\n').encode('utf-8')
+            return
+        self.errors.append('-113,"Undefined header"')
+
+
+    ###########################################################################
+    #
+    # Command implementations
+    #
+    def __idn(self, query, argument):
+        return 'Agilent Technologies,E3631A,0,2.1-5.0-1.0'
+
+    def __rst(self, query, argument):
+        errors = self.errors
+        self.reset()
+        self.errors = errors
+
+    def __cls(self, query, argument):
+        self.errors = []
+
+    def __opc(self, query, argument):
+        return '1'
+
+    def __version(self, query, argument):
+        return '1995.0'
+
+    def __error(self, query, argument):
+        if self.errors:
+            return self.errors.pop(0)
+        return '+0,"No error"'
+
+    def __output(self, query, argument):
+        if query:
+            return '1' if self.output else '0'
+        state = argument.upper()
+        if state in ('ON', '1'):
+            self.output = True
+        elif state in ('OFF', '0'):
+            self.output = False
+        else:
+            raise ValueError('-224,"Illegal parameter value"')
+
+    def __select(self, query, argument):
+        if query:
+            return self.selected
+        channel = argument.upper()
+        if channel not in self.channels:
+            raise ValueError('-224,"Illegal parameter value"')
+        self.selected = channel
+
+    @staticmethod
+    def __number(argument: str) -> float:
+        try:
+            return float(argument)
+        except ValueError:
+            raise ValueError('-104,"Data type error"')
+
+    def __voltage(self, query, argument):
+        setting = self.setting[self.selected]
+        if query:
+            return '{0:+.8E}'.format(setting[0])
+        value = self.__number(argument)
+        low, high = self.channels[self.selected][0]
+        if not low <= value <= high:
+            raise ValueError('-222,"Data out of range"')
+        setting[0] = value
+
+    def __current(self, query, argument):
+        setting = self.setting[self.selected]
+        if query:
+            return '{0:+.8E}'.format(setting[1])
+        value = self.__number(argument)
+        if not 0.0 <= value <= self.channels[self.selected][1]:
+            raise ValueError('-222,"Data out of range"')
+        setting[1] = value
+
+    def __output_point(self, channel: str) -> tuple:
+        """Return (voltage, current, constant current mode) of a channel."""
+        if not self.output:
+            return (0.0, 0.0, False)
+        voltage, limit = self.setting[channel]
+        current = abs(voltage) / self.load
+        if current > limit:
+            return (limit * self.load * (1 if voltage >= 0 else -1), limit, True)
+        return (voltage, current, False)
+
+    def __channel_argument(self, argument: str) -> str:
+        channel = argument.upper() or self.selected
+        if channel not in self.channels:
+            raise ValueError('-224,"Illegal parameter value"')
+        return channel
+
+    def __measure_voltage(self, query, argument):
+        return '{0:+.8E}'.format(self.__output_point(self.__channel_argument(argument))[0])
+
+    def __measure_current(self, query, argument):
+        return '{0:+.8E}'.format(self.__output_point(self.__channel_argument(argument))[1])
+
+    def __isum(self, query, argument, suffix):
+        for channel, limits in self.channels.items():
+            if limits[2] == suffix:
+                return '1' if self.__output_point(channel)[2] else '2'
+        raise ValueError('-114,"Header suffix out of range"')
+
+# EOF
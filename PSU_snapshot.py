@@ -0,0 +1,167 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PSU_snapshot.py - Latest PSU reading in shared memory
+#   0.1     2026.10.19  Initial version.
+#
+#
+# The polling process publishes each PSU().values dictionary into a fixed
+# layout memory-mapped file. Any number of local readers (web API, alarm
+# checker, OBC emulator) read the latest snapshot straight from the mapping,
+# without database queries, sockets or system calls.
+#
+# Consistency is provided by a sequence lock: the writer makes the sequence
+# counter odd before touching the payload and even again afterwards. Reader
+# retries if the counter was odd or changed while the payload was unpacked.
+# There must be only one writer per file.
+#
+import mmap
+import os
+import struct
+import time
+
+from Config_02W import Config
+
+
+class Snapshot:
+
+    #
+    # Memory layout (little-endian, 96 bytes):
+    #
+    #   offset  size    field
+    #        0     4    magic               b'PSU1'
+    #        4     4    (padding)
+    #        8     8    sequence            uint64, odd while being written
+    #       16     8    timestamp           float, time.time() of the reading
+    #       24     1    power               uint8, 1 = "ON", 0 = "OFF"
+    #       25     7    (padding)
+    #       32     8    voltage_setting     float
+    #       40     8    current_limit       float
+    #       48     8    measured_current    float
+    #       56     8    measured_voltage    float
+    #       64    32    state               str, NUL padded
+    #
+    magic       = b'PSU1'
+    header      = struct.Struct('<4s4xQ')
+    sequence    = struct.Struct('<Q')
+    payload     = struct.Struct('<dB7x4d32s')
+    seq_offset  = 8
+    data_offset = header.size
+    size        = header.size + payload.size
+
+
+    class Publisher:
+        """Snapshot.Publisher - writes the latest PSU().values into shared memory."""
+        def __init__(self, filename: str = None):
+            """Create (or reuse) the snapshot file and map it.
+            If filename is omitted, Config.PSU.snapshot_file is used."""
+            self.filename = filename or Config.PSU.snapshot_file
+            fd = os.open(self.filename, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                os.ftruncate(fd, Snapshot.size)
+                self.mm = mmap.mmap(fd, Snapshot.size)
+            finally:
+                os.close(fd)
+            #continue from previous sequence number. Odd one means previous
+            #publisher died while writing: payload is torn, start over empty
+            magic, seq = Snapshot.header.unpack_from(self.mm, 0)
+            if magic != Snapshot.magic or seq & 1:
+                self.mm[Snapshot.data_offset:Snapshot.size] = bytes(Snapshot.payload.size)
+                seq = 0
+            self.seq = seq
+            Snapshot.header.pack_into(self.mm, 0, Snapshot.magic, self.seq)
+
+        def publish(self, values: dict, timestamp: float = None) -> int:
+            """Publish one PSU().values dictionary. Returns the new sequence number."""
+            data = Snapshot.payload.pack(
+                timestamp or time.time(),
+                values["power"] == "ON",
+                values["voltage_setting"],
+                values["current_limit"],
+                values["measured_current"],
+                values["measured_voltage"],
+                values["state"].encode('utf-8')
+            )
+            self.seq += 1
+            Snapshot.sequence.pack_into(self.mm, Snapshot.seq_offset, self.seq)
+            self.mm[Snapshot.data_offset:Snapshot.size] = data
+            self.seq += 1
+            Snapshot.sequence.pack_into(self.mm, Snapshot.seq_offset, self.seq)
+            return self.seq
+
+        def close(self):
+            self.mm.close()
+
+        def __enter__(self):
+            return self
+        def __exit__(self, exc_type, exc_value, traceback):
+            self.close()
+
+
+    class Reader:
+        """Snapshot.Reader - reads the latest published PSU().values from shared memory."""
+        def __init__(self, filename: str = None):
+            """Map the snapshot file read-only. Raises FileNotFoundError if
+            publisher has not created it and ValueError if layout is unknown.
+            If filename is omitted, Config.PSU.snapshot_file is used."""
+            self.filename = filename or Config.PSU.snapshot_file
+            with open(self.filename, 'rb') as f:
+                self.mm = mmap.mmap(f.fileno(), Snapshot.size, access=mmap.ACCESS_READ)
+            if self.mm[0:4] != Snapshot.magic:
+                self.mm.close()
+                raise ValueError("Unknown snapshot layout in '{}'".format(self.filename))
+
+        @property
+        def sequence(self) -> int:
+            """Sequence number of the latest snapshot (0 = nothing published yet)."""
+            return Snapshot.sequence.unpack_from(self.mm, Snapshot.seq_offset)[0]
+
+        def read(self, timeout: float = 0.1) -> dict:
+            """Return consistent copy of the latest snapshot as a dictionary,
+            with additional "timestamp" and "sequence" keys, or None if nothing
+            has been published yet. Raises ValueError if no consistent copy
+            is seen within 'timeout' seconds (publisher died while writing)."""
+            unpack_seq  = Snapshot.sequence.unpack_from
+            unpack_data = Snapshot.payload.unpack_from
+            deadline = None
+            while True:
+                seq = unpack_seq(self.mm, Snapshot.seq_offset)[0]
+                if not seq & 1:
+                    data = unpack_data(self.mm, Snapshot.data_offset)
+                    if unpack_seq(self.mm, Snapshot.seq_offset)[0] == seq:
+                        break
+                #writer is updating the payload, let it run
+                if deadline is None:
+                    deadline = time.monotonic() + timeout
+                elif time.monotonic() > deadline:
+                    raise ValueError("Snapshot '{}' not consistent in {:1.2f} s".format(
+                        self.filename, timeout))
+                time.sleep(0)
+            if seq == 0:
+                return None
+            return dict({
+                "power"               :"ON" if data[1] else "OFF",
+                "voltage_setting"     :data[2],
+                "current_limit"       :data[3],
+                "measured_current"    :data[4],
+                "measured_voltage"    :data[5],
+                "state"               :data[6].rstrip(b'\0').decode('utf-8'),
+                "timestamp"           :data[0],
+                "sequence"            :seq
+            })
+
+        def close(self):
+            self.mm.close()
+
+        def __enter__(self):
+            return self
+        def __exit__(self, exc_type, exc_value, traceback):
+            self.close()
+
+
+if __name__ == "__main__":
+    """Print the latest published snapshot"""
+    with Snapshot.Reader() as reader:
+        print(reader.read())
+
+# EOF
@@ -0,0 +1,296 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PSU_soak.py - Long-duration soak test for PSU class
+#   0.1     2026.10.19  Initial version.
+#
+#
+# Drives PSU through a random mix of snapshots, setter changes, channel
+# switches and induced read timeouts for hours, against real hardware or
+# PSU_emulator.Emulator. Every 'interval' seconds a sample is recorded:
+#
+#       RSS, tracemalloc traced size and top allocators (vs. start),
+#       GC collection counts and tracked object count,
+#       latency percentiles and error counts of each workload.
+#
+# At the end, a drift report flags series that grow monotonically over the
+# run (Kendall's tau close to +1 and relative growth above threshold), so
+# leaks or slowdown in the serial and parsing path are caught before
+# deployment.
+#
+#       python3 PSU_soak.py --emulate --hours 0.1 --interval 10
+#       python3 PSU_soak.py --port /dev/ttyUSB0 --hours 8 --output soak.jsonl
+#
+import gc
+import json
+import os
+import random
+import resource
+import time
+import tracemalloc
+
+from Config_02W import Config
+
+
+class Soak:
+
+    def __init__(self, psu, interval: float = 60.0, top: int = 10,
+                 trace: bool = True, seed: int = None, output = None):
+        """Soak test 'psu' (PSU instance). Sample every 'interval' seconds,
+        keeping 'top' tracemalloc allocators (if 'trace' is set). Samples are
+        written as JSON lines to 'output' (file object), if given; only the
+        drift-tracked numbers are kept in memory."""
+        self.psu      = psu
+        self.interval = interval
+        self.top      = top
+        self.trace    = trace
+        self.output   = output
+        self.random   = random.Random(seed)
+        self.count    = 0           # samples taken
+        self.metrics  = {}          # drift-tracked numbers, see record()
+        # name: (function, weight)
+        self.workloads = {
+            'snapshot'  : (self.snapshot,  8),
+            'setpoint'  : (self.setpoint,  4),
+            'channel'   : (self.channel,   2),
+            'timeout'   : (self.timeout,   1)
+        }
+
+
+    ###########################################################################
+    #
+    # Workloads
+    #
+    def snapshot(self):
+        self.psu.values
+
+    def setpoint(self):
+        #stay between zero and defaults, safe for whatever is connected
+        voltage = round(self.random.uniform(0.1, 1.0) * Config.PSU.default_voltage, 3)
+        current = round(self.random.uniform(0.5, 1.0) * Config.PSU.default_current_limit, 3)
+        if self.random.random() < 0.5:
+            self.psu.voltage = voltage
+        else:
+            self.psu.current_limit = current
+
+    def channel(self):
+        self.psu.select_channel(self.random.choice(('P6V', 'N25V')))
+        self.psu.read_selected_channel()
+        self.psu.select_channel('P25V')
+        if self.psu.read_selected_channel()[0:4] != 'P25V':
+            raise ValueError('selected channel not verified')
+
+    def timeout(self):
+        #read without a pending response, must time out
+        self.psu.set_remote_mode()
+        try:
+            self.psu._PSU__read_message()
+        except ValueError:
+            return
+        raise ValueError('induced timeout was not detected')
+
+
+    ###########################################################################
+    #
+    # Sampling
+    #
+    @staticmethod
+    def rss() -> int:
+        """Current resident set size in bytes."""
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            #peak value, in kilobytes on Linux
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    @staticmethod
+    def percentile(values: list, p: float) -> float:
+        """Nearest-rank percentile of sorted 'values'."""
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(p / 100.0 * len(values)))]
+
+    @staticmethod
+    def snapshot_traces():
+        """tracemalloc snapshot without the soak harness' own allocations
+        (tracked numbers grow by design)."""
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, __file__)
+        ))
+
+    def sample(self, elapsed: float, latencies: dict, errors: dict) -> dict:
+        sample = dict({
+            "elapsed"     :round(elapsed, 1),
+            "rss"         :self.rss(),
+            "gc_objects"  :len(gc.get_objects()),
+            "gc_collections" :[s["collections"] for s in gc.get_stats()]
+        })
+        if self.trace:
+            snapshot = self.snapshot_traces()
+            statistics = snapshot.compare_to(self.baseline, 'lineno')
+            sample["traced"] = sum(trace.size for trace in snapshot.traces)
+            sample["top"] = [str(s) for s in statistics[:self.top]]
+        for name in self.workloads:
+            values = sorted(latencies[name])
+            sample[name] = dict({
+                "count"   :len(values),
+                "errors"  :errors[name],
+                "p50"     :self.percentile(values, 50),
+                "p90"     :self.percentile(values, 90),
+                "p99"     :self.percentile(values, 99),
+                "max"     :values[-1] if values else None
+            })
+        return sample
+
+
+    ###########################################################################
+    #
+    # Run and report
+    #
+    def run(self, duration: float) -> list:
+        """Run mixed workload for 'duration' seconds. Returns series()."""
+        names   = list(self.workloads)
+        weights = [self.workloads[n][1] for n in names]
+        if self.trace:
+            tracemalloc.start()
+            self.baseline = self.snapshot_traces()
+        start = time.perf_counter()
+        next_sample = start + self.interval
+        latencies = {name: [] for name in names}
+        errors    = {name: 0 for name in names}
+        try:
+            while True:
+                name = self.random.choices(names, weights)[0]
+                t0 = time.perf_counter()
+                try:
+                    self.workloads[name][0]()
+                except ValueError:
+                    errors[name] += 1
+                    #drop late response, if any
+                    self.psu.serial_port.reset_input_buffer()
+                    #setpoint() must never write to another channel
+                    self.psu.select_channel('P25V')
+                t1 = time.perf_counter()
+                latencies[name].append(t1 - t0)
+                if t1 >= next_sample:
+                    sample = self.sample(t1 - start, latencies, errors)
+                    self.record(sample)
+                    if self.output:
+                        self.output.write(json.dumps(sample) + '\n')
+                        self.output.flush()
+                    latencies = {name: [] for name in names}
+                    errors    = {name: 0 for name in names}
+                    next_sample += self.interval
+                    if t1 - start >= duration:
+                        break
+        finally:
+            if self.trace:
+                tracemalloc.stop()
+            #leave the PSU as initialized
+            self.psu.select_channel('P25V')
+            self.psu.voltage = Config.PSU.default_voltage
+            self.psu.current_limit = Config.PSU.default_current_limit
+        return self.series()
+
+    def record(self, sample: dict):
+        """Keep the drift-tracked numbers of a sample. Plain numbers in
+        preallocated lists, so the harness itself adds no gc-tracked
+        objects per sample (it would show as 'gc_objects' drift)."""
+        numbers = [("rss", sample["rss"]), ("gc_objects", sample["gc_objects"])]
+        if self.trace:
+            numbers.append(("traced", sample["traced"]))
+        for name in self.workloads:
+            for p in ("p50", "p99"):
+                numbers.append((name + "." + p, sample[name][p]))
+        for name, value in numbers:
+            self.metrics.setdefault(name, []).append(value)
+        self.count += 1
+
+    def series(self) -> dict:
+        """Return {name: [value per sample]} for every drift-tracked metric."""
+        return {name: values for name, values in self.metrics.items()
+                if None not in values}
+
+    @staticmethod
+    def trend(values: list) -> tuple:
+        """Return (Kendall's tau, relative growth) of 'values'. Tau is +1.0
+        for strictly monotonic growth and about 0.0 for noise."""
+        n = len(values)
+        s = 0
+        for i in range(n):
+            for j in range(i + 1, n):
+                s += (values[j] > values[i]) - (values[j] < values[i])
+        tau = s / (n * (n - 1) / 2.0)
+        #compare averages of first and last quarters to tolerate noise
+        k = max(1, n // 4)
+        first = sum(values[:k]) / k
+        last  = sum(values[-k:]) / k
+        growth = (last - first) / first if first else 0.0
+        return (tau, growth)
+
+    def report(self, warmup: int = None, tau: float = 0.6, growth: float = 0.05) -> list:
+        """Return list of (metric, tau, growth, flagged) rows. Metric is
+        flagged as drifting if tau >= 'tau' and relative growth >= 'growth'.
+        First 'warmup' samples (default: 10 %, at least one) are excluded
+        (imports, caches, allocator)."""
+        if warmup is None:
+            warmup = max(1, self.count // 10)
+        rows = []
+        for name, values in self.series().items():
+            values = values[warmup:]
+            if len(values) < 4:
+                continue
+            t, g = self.trend(values)
+            rows.append((name, t, g, t >= tau and g >= growth))
+        return rows
+
+
+if __name__ == "__main__":
+    """Soak test from command line"""
+    import argparse
+    import sys
+    from PSU_A017W import PSU
+
+    parser = argparse.ArgumentParser(description = "Long-duration soak test for PSU class.")
+    parser.add_argument('--port', default = Config.PSU.port,
+                        help = "serial port (default: %(default)s)")
+    parser.add_argument('--emulate', action = 'store_true',
+                        help = "use PSU_emulator.Emulator instead of a serial port")
+    parser.add_argument('--hours', type = float, default = 4.0,
+                        help = "test duration (default: %(default)s)")
+    parser.add_argument('--interval', type = float, default = 60.0,
+                        help = "sampling interval in seconds (default: %(default)s)")
+    parser.add_argument('--top', type = int, default = 10,
+                        help = "tracemalloc allocators per sample (default: %(default)s)")
+    parser.add_argument('--no-trace', action = 'store_true',
+                        help = "disable tracemalloc (it slows allocations down)")
+    parser.add_argument('--seed', type = int, default = None)
+    parser.add_argument('--output', type = argparse.FileType('w'), default = '-',
+                        help = "write samples as JSON lines to this file (default: stdout)")
+    args = parser.parse_args()
+
+    if args.emulate:
+        from PSU_emulator import Emulator
+        port = Emulator(timeout = Config.PSU.timeout)
+    else:
+        port = args.port
+
+    with PSU(port) as psu:
+        soak = Soak(psu, args.interval, args.top, not args.no_trace, args.seed, args.output)
+        soak.run(args.hours * 3600)
+
+    #samples may go to stdout, keep it valid JSON lines
+    print(file = sys.stderr)
+    print("{0:<20s} {1:>6s} {2:>9s}".format("metric", "tau", "growth"), file = sys.stderr)
+    drifting = False
+    for name, tau, growth, flagged in soak.report():
+        drifting = drifting or flagged
+        print("{0:<20s} {1:6.2f} {2:8.1f}%  {3}".format(
+            name, tau, growth * 100, "DRIFT" if flagged else ""), file = sys.stderr)
+    if drifting:
+        sys.exit(1)
+
+# EOF
@@ -0,0 +1,301 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# PSU_supervisor.py - Connection health supervisor for PSU class
+#   0.1     2026.10.19  Initial version.
+#
+#
+# Supervisor wraps an initialized PSU and offers the same interface. When
+# the serial link is lost (USB-serial adapter reset), the next call (or the
+# optional heartbeat thread) reopens the port - re-finding it by USB
+# identity if the device node changed - and restores the last known
+# channel and setpoints in one pipelined write. The failed call is then
+# retried once. The slow PSU.__init__() sequence is not repeated.
+#
+# While the link is being restored, calls from other threads wait for it
+# (up to 'timeout' seconds), or raise Supervisor.LinkDown immediately if
+# 'fail_fast' is set - also after a failed restore, until a non fail-fast
+# call, check() or the heartbeat restores the link.
+#
+#       with Supervisor(PSU()) as psu:
+#           psu.start(heartbeat = 5.0)
+#           psu.voltage = 3.3
+#           print(psu.values)
+#
+import os
+import threading
+import time
+
+import serial
+
+from PSU_A017W import PSU
+
+
+class Supervisor:
+
+    class LinkDown(serial.SerialException):
+        """Raised when the link to PSU could not be restored (in time)."""
+        pass
+
+
+    class Measure:
+        """Supervisor.Measure - supervised PSU().measure functions."""
+        def __init__(self, supervisor):
+            self.supervisor = supervisor
+
+        def voltage(self) -> float:
+            return self.supervisor.call(lambda psu: psu.measure.voltage())
+
+        def current(self) -> float:
+            return self.supervisor.call(lambda psu: psu.measure.current())
+
+
+    def __init__(self, psu: PSU, timeout: float = 30.0, retry_interval: float = 1.0,
+                 fail_fast: bool = False, locate = None):
+        """Supervise initialized 'psu'. Link is restored within 'timeout'
+        seconds or Supervisor.LinkDown is raised. 'locate' may be given as a
+        function returning the port (name or object) to reopen; by default
+        the port is searched as described in Supervisor.locate()."""
+        self.psu            = psu
+        self.timeout        = timeout
+        self.retry_interval = retry_interval
+        self.fail_fast      = fail_fast
+        self.measure        = self.Measure(self)
+        self.lock           = threading.RLock()
+        self.down           = False
+        self.reconnecting   = False
+        self.reconnects     = 0
+        self.heartbeat      = None
+        self.stopped        = threading.Event()
+        if locate is not None:
+            self.locate = locate
+        self.device   = psu.serial_port.port
+        self.identity = self.__identify(self.device)
+        #last known state, restored after reconnect
+        channel = psu.read_selected_channel().strip()
+        self.state = dict({
+            "channel"   :channel,
+            "power"     :psu.power,
+            "setpoints" :{channel: [psu.voltage, psu.current_limit]}
+        })
+
+
+    ###########################################################################
+    #
+    # Supervised PSU interface
+    #
+    @property
+    def power(self) -> bool:
+        return self.call(lambda psu: psu.power)
+
+    #setters record the value read back from the device, so that a rejected
+    #setting is never restored after reconnect. State is recorded inside the
+    #supervised call (under the lock), for the channel read back there too
+
+    @power.setter
+    def power(self, value: bool):
+        def set_power(psu):
+            psu.power = value
+            self.state["power"] = psu.power
+        self.call(set_power)
+
+    @property
+    def voltage(self) -> float:
+        return self.call(lambda psu: psu.voltage)
+
+    @voltage.setter
+    def voltage(self, value: float):
+        def set_voltage(psu):
+            psu.voltage = value
+            self.__setpoints(psu)[0] = psu.voltage
+        self.call(set_voltage)
+
+    @property
+    def current_limit(self) -> float:
+        return self.call(lambda psu: psu.current_limit)
+
+    @current_limit.setter
+    def current_limit(self, value: float):
+        def set_current_limit(psu):
+            psu.current_limit = value
+            self.__setpoints(psu)[1] = psu.current_limit
+        self.call(set_current_limit)
+
+    @property
+    def status(self) -> str:
+        return self.call(lambda psu: psu.status)
+
+    @property
+    def values(self) -> dict:
+        return self.call(lambda psu: psu.values)
+
+    def select_channel(self, channel: str):
+        def select(psu):
+            psu.select_channel(channel)
+            self.state["channel"] = psu.read_selected_channel().strip()
+        self.call(select)
+
+    def read_selected_channel(self) -> str:
+        return self.call(lambda psu: psu.read_selected_channel())
+
+    def __setpoints(self, psu: PSU = None) -> list:
+        """Return [voltage, current limit] of the selected channel, read back
+        from 'psu' if given (call with the lock held)."""
+        if psu is not None:
+            self.state["channel"] = psu.read_selected_channel().strip()
+        return self.state["setpoints"].setdefault(self.state["channel"], [None, None])
+
+
+    ###########################################################################
+    #
+    # Supervision
+    #
+    def call(self, function, fail_fast: bool = None):
+        """Call function(psu) with the link supervised. Link loss (serial
+        port errors) triggers reconnect, after which function is retried
+        once. Timeouts (ValueError) are passed to the caller as is.
+        'fail_fast' overrides the supervisor setting for this call."""
+        if fail_fast is None:
+            fail_fast = self.fail_fast
+        if self.down and fail_fast:
+            raise self.LinkDown("PSU link is down")
+        if not self.lock.acquire(timeout = self.timeout):
+            raise self.LinkDown("PSU link not available in {0:1.1f} s".format(self.timeout))
+        try:
+            if not self.down:
+                try:
+                    return function(self.psu)
+                except (serial.SerialException, OSError):
+                    self.down = True
+            self.restore()
+            return function(self.psu)
+        finally:
+            self.lock.release()
+
+    def check(self):
+        """Heartbeat: issue a cheap query, reconnecting if the link is lost
+        (also in fail-fast mode)."""
+        self.call(lambda psu: psu.read_selected_channel(), fail_fast = False)
+
+    def restore(self):
+        """Reopen the port and restore last known channel and setpoints.
+        Retries every 'retry_interval' seconds for up to 'timeout' seconds,
+        then raises Supervisor.LinkDown. Errors the device reports for the
+        restored settings are not link failures: the link is kept up and
+        PSU.PipelineError is raised."""
+        with self.lock:
+            self.down = True
+            self.reconnecting = True
+            error = None
+            deadline = time.monotonic() + self.timeout
+            try:
+                while True:
+                    try:
+                        port = self.locate()
+                        if port is None:
+                            raise self.LinkDown("PSU not found")
+                        self.psu.reconnect(port)
+                        #clear partial input from before the link loss
+                        self.psu.serial_port.reset_input_buffer()
+                        #pipeline starts with '\r\n*CLS', ending any partial
+                        #command and dropping its errors before restoring
+                        self.__restore_state()
+                        break
+                    except PSU.PipelineError as e:
+                        error = e
+                        break
+                    except (serial.SerialException, OSError, ValueError) as e:
+                        if time.monotonic() + self.retry_interval > deadline:
+                            raise self.LinkDown("PSU link not restored: {0}".format(e)) from e
+                        time.sleep(self.retry_interval)
+            finally:
+                self.reconnecting = False
+            if not isinstance(port, str):
+                port = getattr(port, 'port', None)
+            if isinstance(port, str):
+                self.device = port
+            self.reconnects += 1
+            self.down = False
+            if error is not None:
+                raise error
+
+    def __restore_state(self):
+        """Restore channel setpoints and output state in one write."""
+        with self.psu.pipeline() as p:
+            for channel, (voltage, current_limit) in self.state["setpoints"].items():
+                if channel == self.state["channel"]:
+                    continue
+                p.select_channel(channel)
+                if voltage is not None:
+                    p.voltage = voltage
+                if current_limit is not None:
+                    p.current_limit = current_limit
+            voltage, current_limit = self.__setpoints()
+            p.select_channel(self.state["channel"])
+            if voltage is not None:
+                p.voltage = voltage
+            if current_limit is not None:
+                p.current_limit = current_limit
+            p.power = self.state["power"]
+
+
+    ###########################################################################
+    #
+    # Finding the port again
+    #
+    @staticmethod
+    def __identify(device: str) -> tuple:
+        """Return USB identity (vid, pid, serial number or location) of
+        the device or None if it is not a USB serial port."""
+        import serial.tools.list_ports
+        for p in serial.tools.list_ports.comports(include_links=False):
+            if p.device == device and p.vid is not None:
+                return (p.vid, p.pid, p.serial_number or p.location)
+        return None
+
+    def locate(self):
+        """Return port to reopen: the same device node if it exists, the
+        port with the same USB identity, or one found by PSU.find()."""
+        if self.device and os.path.exists(self.device):
+            if self.identity is None or self.__identify(self.device) == self.identity:
+                return self.device
+        if self.identity is not None:
+            import serial.tools.list_ports
+            for p in serial.tools.list_ports.comports(include_links=False):
+                if (p.vid, p.pid, p.serial_number or p.location) == self.identity:
+                    return p.device
+        return PSU.find()
+
+
+    ###########################################################################
+    #
+    # Heartbeat thread
+    #
+    def start(self, heartbeat: float = 5.0):
+        """Start background thread checking the link every 'heartbeat' seconds."""
+        def run():
+            while not self.stopped.wait(heartbeat):
+                try:
+                    self.check()
+                except (serial.SerialException, OSError, ValueError):
+                    #keep trying, callers see the errors
+                    pass
+        self.stopped.clear()
+        self.heartbeat = threading.Thread(target = run, name = 'PSU heartbeat', daemon = True)
+        self.heartbeat.start()
+
+    def stop(self):
+        """Stop heartbeat thread."""
+        self.stopped.set()
+        if self.heartbeat is not None:
+            self.heartbeat.join()
+            self.heartbeat = None
+
+
+    def __enter__(self):
+        return self
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        self.psu.__exit__(exc_type, exc_value, traceback)
+
+# EOF